@@ -168,7 +168,6 @@ texinfo_documents = [
 intersphinx_mapping = {
     'https://docs.python.org/3': None,
     'blessed': ('http://blessed.readthedocs.io/en/latest/', None),
-    'progressbar': ('http://progressbar-2.readthedocs.io/en/latest/', None),
     'click': ('http://click.pocoo.org/5/', None),
     'chardet': ('http://chardet.readthedocs.io/en/latest/', None)
 }
@@ -7,15 +7,19 @@ user once the transcoding has been started.
 """
 
 import os
-import time
+import itertools
+import collections
+import concurrent.futures
 
 import click
-import progressbar
-import blessed
 
-from filmalize.errors import ProbeError, ProgressFinishedError
-from filmalize.cli_models import Writer, ErrorWriter, CliContainer
-from filmalize.menus import main_menu
+import filmalize.defaults as defaults
+from filmalize.errors import ProbeError
+from filmalize.models import save_probe_cache
+from filmalize.cli_models import CliContainer
+
+# asyncio, blessed, the menus and the supervisor are only needed to convert, so
+# they are imported where they are used to keep other invocations fast.
 
 
 # Allow help to be called with '-h' as well as the default '--help'.
@@ -59,41 +63,89 @@ def exclusive(ctx_params, exclusive_params, error_message):
 
     """
 
-    if sum([1 if ctx_params[p] else 0 for p in exclusive_params]) > 1:
-        raise click.UsageError(error_message)
+    found = 0
+    for param in exclusive_params:
+        if ctx_params[param]:
+            found += 1
+            if found > 1:
+                raise click.UsageError(error_message)
+
+
+def find_files(directory, recursive):
+    """Utility function to find the files in a directory.
+
+    Note:
+        Files are yielded as they are found, in sorted order within each
+        directory. When recursing, the files in a directory are yielded
+        before those in its subdirectories, which are visited in sorted order.
+
+    Args:
+        directory (:obj:`str`): The directory to search.
+        recursive (:obj:`bool`): Whether to search subdirectories.
+
+    Yields:
+        :obj:`str`: The path of each file found.
+
+    """
+
+    if not recursive:
+        yield from sorted(dir_entry.path for dir_entry in os.scandir(directory)
+                          if dir_entry.is_file())
+        return
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for file_name in sorted(files):
+            yield os.path.join(root, file_name)
 
 
 def build_containers(file_list):
-    """Utility function to build a list of :obj:`Container` instances given a
-    list of filenames.
+    """Utility function to build :obj:`Container` instances given a list of
+    filenames.
 
     Note:
-        If a container fails to build as the result of a ffprobe error, that
-        error is echoed after building has completed. If no containers are
-        built, an empty list is returned.
+        Files are probed concurrently in a pool of threads, and each container
+        is yielded, in order, as soon as it has been built. Files are taken
+        from the file list as containers are yielded, so no more files are
+        listed than can be probed at once. If a container fails to build as
+        the result of a ffprobe error, that error is echoed and the file is
+        skipped. The probe results are saved for the next run
+        once iteration has finished.
 
     Args:
-        file_list (:obj:`list` of :obj:`str`): File names to attempt to build
+        file_list (iterable of :obj:`str`): File names to attempt to build
             into containers.
 
-    Returns:
-        :obj:`list` of :obj:`Container`: Succesfully built containers.
+    Yields:
+        :obj:`Container`: Succesfully built containers.
 
     """
 
-    containers = []
-    errors = []
-    with click.progressbar(file_list, label='Scanning Files') as pr_bar:
-        for file_name in pr_bar:
-            try:
-                containers.append(CliContainer.from_file(file_name))
-            except ProbeError as _e:
-                errors.append(_e)
-    for error in errors:
-        click.secho('Warning: unable to process {}'
-                    .format(error.file_name), fg='red')
-        click.echo(error.message)
-    return sorted(containers, key=lambda container: container.file_name)
+    workers = min(32, (os.cpu_count() or 1) * 4)
+    file_list = iter(file_list)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = collections.deque(
+            pool.submit(CliContainer.from_file, file_name)
+            for file_name in itertools.islice(file_list, workers)
+        )
+        try:
+            while futures:
+                future = futures.popleft()
+                file_name = next(file_list, None)
+                if file_name is not None:
+                    futures.append(pool.submit(CliContainer.from_file,
+                                               file_name))
+                try:
+                    container = future.result()
+                except ProbeError as _e:
+                    click.secho('Warning: unable to process {}'
+                                .format(_e.file_name), fg='red')
+                    click.echo(_e.message)
+                    continue
+                yield container
+        finally:
+            for future in futures:
+                future.cancel()
+            save_probe_cache()
 
 
 @click.group(context_settings=CONTEXT_SETTINGS)
@@ -127,17 +179,7 @@ def cli(ctx, single_file, directory, recursive):
         ctx.obj['FILES'] = [single_file]
     else:
         directory = directory if directory else '.'
-        if recursive:
-            ctx.obj['FILES'] = sorted(
-                [os.path.join(root, single_file)
-                 for root, dirs, files in os.walk(directory)
-                 for single_file in files]
-            )
-        else:
-            ctx.obj['FILES'] = sorted(
-                [dir_entry.path for dir_entry in os.scandir(directory)
-                 if dir_entry.is_file()]
-            )
+        ctx.obj['FILES'] = find_files(directory, recursive)
 
 
 @cli.command()
@@ -150,48 +192,43 @@ def display(ctx):
 
 
 @cli.command()
+@click.option(
+    '-j', '--jobs', type=click.IntRange(1, None),
+    help='Number of files to convert at once.'
+)
 @click.pass_context
-def convert(ctx):
+def convert(ctx, jobs):
     """Convert video file(s)"""
 
+    import asyncio
+    import blessed
+    from filmalize.cli_models import Writer, ErrorWriter, ProgressBar
+    from filmalize.menus import main_menu
+    from filmalize.supervisor import supervise
+
+    limit = jobs if jobs else defaults.MAX_CONVERSIONS
     containers = build_containers(ctx.obj['FILES'])
-    running = main_menu(containers)
+    running = main_menu(containers, limit)
+    if not running:
+        return
     terminal = blessed.Terminal()
     err = ErrorWriter(terminal)
 
-    padding = max([len(container.file_name) for container in running])
+    padding = max(len(container.file_name) for container in running)
+    total_ms = 0
     for line_number, container in enumerate(running):
         container.add_progress(terminal, line_number + 2, padding)
+        total_ms += container.microseconds
 
     writer = Writer(0, terminal, 'bold_blue_on_black')
-    total_ms = sum([container.microseconds for container in running])
-    widgets = [progressbar.Percentage(), ' ', progressbar.Bar(),
-               ' ', progressbar.Timer(), ' | ', progressbar.ETA()]
-    pr_bar = progressbar.ProgressBar(max_value=total_ms, widgets=widgets,
-                                     fd=writer)
+    pr_bar = ProgressBar(total_ms, writer, timer=True)
 
+    loop = asyncio.new_event_loop()
     with terminal.fullscreen():
-        while running:
-            total_progress = 0
-            for container in running:
-                try:
-                    progress = container.progress
-                    container.pr_bar.update(progress)
-                except (ProgressFinishedError) as _e:
-                    if container.process.returncode:
-                        err.write('Warning: ffmpeg error while converting '
-                                  '{}'.format(container.file_name))
-                        err.write(container.process.communicate()[1]
-                                  .strip(os.linesep))
-
-                    running.remove(container)
-                    progress = container.microseconds
-                    container.pr_bar.finish()
-
-                total_progress += progress
-
-            pr_bar.update(total_progress)
-            time.sleep(0.2)
+        try:
+            loop.run_until_complete(supervise(running, pr_bar, err, limit))
+        finally:
+            loop.close()
 
     pr_bar.finish()
     click.clear()
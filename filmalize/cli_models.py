@@ -5,8 +5,9 @@ core classes extended with additional functionality for command-line use.
 
 """
 
+import time
+
 import click
-import progressbar
 
 from filmalize.models import Container, ContainerLabel, Stream, SubtitleFile
 from filmalize.errors import ProbeError
@@ -31,18 +32,25 @@ class SelectStreams(click.ParamType):
         self.container = container
 
     def convert(self, value, param, ctx):
-        """Attempt to set input indexes as Container.streams."""
+        """Attempt to set input indexes as Container.streams.
+
+        Indexes may be separated by any amount of whitespace, and repeated
+        indexes are only selected once. At least one index must be entered.
+
+        """
 
         try:
-            selected = [int(index) for index in value.strip().split(' ')]
-        except (ValueError, TypeError):
-            self.fail('Invalid input. Enter stream indexes separated by a '
-                      'single space')
+            selected = {int(index) for index in value.split()}
+        except (ValueError, TypeError, AttributeError):
+            selected = None
+        if not selected:
+            self.fail('Invalid input. Enter stream indexes separated by '
+                      'spaces')
 
         try:
             self.container.selected = selected
         except ValueError as _e:
-            self.fail(_e)
+            self.fail(str(_e))
 
 
 class Writer(object):
@@ -87,20 +95,81 @@ class Writer(object):
             else:
                 print(message)
 
-    @staticmethod
-    def flush():
-        """Pretend to flush as if :obj:`Writer` was a real file descriptor.
 
-        :obj:`progressbar.bar.ProgressBar` objects expect to flush their file
-        descriptors, but since we're actually printing to a
-        :obj:`blessed.terminal.Terminal`, this method is needed to keep the
-        progress bars happy.
+class ProgressBar(object):
+    """Draw a progress bar with a :obj:`Writer`.
 
-        Returns:
-            :obj:`bool`: True
+    The bar shows the percentage complete and an estimate of the time
+    remaining, optionally preceded by a label and followed by the time
+    elapsed. It is stretched to fill the width of the terminal and redrawn on
+    every update, so the caller decides how often to refresh it. Timing starts
+    with the first update.
+
+    Args:
+        max_value (:obj:`int`): The value at which the bar is full.
+        writer (:obj:`Writer`): Where to draw the bar.
+        label (:obj:`str`, optional): Text to display before the bar.
+        timer (:obj:`bool`, optional): Whether to display the time elapsed.
+
+    Attributes:
+        max_value (:obj:`int`): The value at which the bar is full.
+        writer (:obj:`Writer`): Where to draw the bar.
+        label (:obj:`str`): Text to display before the bar.
+        timer (:obj:`bool`): Whether to display the time elapsed.
+        value (:obj:`int`): The most recent value drawn.
+        start (:obj:`float`): When the first update was drawn.
+
+    """
+
+    def __init__(self, max_value, writer, label=None, timer=False):
+
+        self.max_value = max_value
+        self.writer = writer
+        self.label = label
+        self.timer = timer
+        self.value = 0
+        self.start = None
+
+    def update(self, value):
+        """Draw the bar for a given value.
+
+        Args:
+            value (:obj:`int`): The progress made, out of
+                :obj:`ProgressBar.max_value`.
 
         """
-        return True
+
+        now = time.monotonic()
+        if self.start is None:
+            self.start = now
+        self.value = value
+        elapsed = now - self.start
+        fraction = min(value / self.max_value, 1) if self.max_value else 1
+
+        left = '{:4.0%} '.format(fraction)
+        if self.label:
+            left = '{} | {}'.format(self.label, left)
+        if fraction >= 1:
+            right = 'Time: {}'.format(_clock(elapsed))
+        elif value:
+            right = 'ETA: {}'.format(_clock(elapsed * (1 - fraction)
+                                            / fraction))
+        else:
+            right = 'ETA:  --:--:--'
+        right = ' ' + right
+        if self.timer:
+            right = ' Elapsed Time: {} |{}'.format(_clock(elapsed), right)
+
+        width = max(0, self.writer.terminal.width - len(left) - len(right)
+                    - 3)
+        filled = int(width * fraction)
+        self.writer.write('{}|{}{}|{}'.format(left, '#' * filled,
+                                              ' ' * (width - filled), right))
+
+    def finish(self):
+        """Draw the bar as full."""
+
+        self.update(self.max_value)
 
 
 class ErrorWriter(object):
@@ -148,13 +217,13 @@ class CliContainer(Container):
     Args:
         writer (:obj:`Writer`, optional): Object with which to display the
             progress bar.
-        pr_bar (:obj:`progressbar.bar.ProgressBar`, optional): Progress bar to
+        pr_bar (:obj:`ProgressBar`, optional): Progress bar to
             display the progress of converting this container.
         **kwargs: :obj:`Container` arguments.
 
     Attributes:
         writer (:obj:`Writer`): Object with which to write.
-        pr_bar (:obj:`progressbar.bar.ProgressBar`): Progress bar to write.
+        pr_bar (:obj:`ProgressBar`): Progress bar to write.
 
     """
 
@@ -191,8 +260,7 @@ class CliContainer(Container):
                    labels=labels)
 
     def add_progress(self, terminal, line_number, padding):
-        """Build a :obj:`progressbar.bar.Progressbar` instance for this
-        Container.
+        """Build a :obj:`ProgressBar` instance for this Container.
 
         Args:
             terminal (:obj:`blessed.terminal.Terminal`): Terminal to display
@@ -204,58 +272,103 @@ class CliContainer(Container):
         """
 
         label = '{name:{length}}'.format(name=self.file_name, length=padding)
-        widgets = [label, ' | ', progressbar.Percentage(), ' ',
-                   progressbar.Bar(), ' ', progressbar.ETA()]
         self.writer = Writer(line_number, terminal, 'red_on_black')
-        self.pr_bar = progressbar.ProgressBar(
-            max_value=self.microseconds, widgets=widgets, fd=self.writer)
+        self.pr_bar = ProgressBar(self.microseconds, self.writer, label)
 
-    def display(self):
-        """Echo a pretty representation of this Container."""
-        click.secho('*** File: {} ***'.format(self.file_name), fg='magenta')
+    def add_subtitle_file(self, file_name, encoding=None):
+        """Add an external subtitle file (:obj:`CliSubFile`). Optionally set a
+        custom file encoding.
+
+        Args:
+            file_name (:obj:`str`): The name of the subtitle file.
+            encoding (:obj:`str`, optional): The encoding of the subtitle file.
+
+        """
+
+        self.subtitle_files.append(CliSubFile(file_name, encoding))
+
+    def describe(self):
+        """Build a pretty representation of this Container.
+
+        Returns:
+            :obj:`list` of :obj:`str`: The styled lines of the representation.
+
+        """
+
+        lines = [click.style('*** File: {} ***'.format(self.file_name),
+                             fg='magenta')]
         if self.labels.title:
-            click.secho('Title: {}'.format(self.labels.title), fg='cyan')
+            lines.append(click.style('Title: {}'.format(self.labels.title),
+                                     fg='cyan'))
 
         file_description = ['Length: {}'.format(self.labels.length)]
         file_description.append('Size: {}MiB'.format(self.labels.size))
         file_description.append('Bitrate: {}Mib/s'.format(self.labels.bitrate))
         file_description.append('Container: {}'
                                 .format(self.labels.container_format))
-        click.echo(' | '.join(file_description))
+        lines.append(' | '.join(file_description))
 
         for stream in self.streams:
-            stream.display()
+            lines.extend(stream.describe())
 
         for sub_file in self.subtitle_files:
-            sub_file.display()
+            lines.extend(sub_file.describe())
 
-    def display_conversion(self):
-        """Echo a pretty representation of the conversion actions to perform on
-        this Container."""
+        return lines
 
-        click.clear()
-        self.display()
-        click.secho('Filmalize Actions:', fg='cyan', bold=True)
+    def describe_conversion(self):
+        """Build a pretty representation of this Container and the conversion
+        actions to perform on it.
+
+        Returns:
+            :obj:`list` of :obj:`str`: The styled lines of the representation.
+
+        """
+
+        lines = self.describe()
+        lines.append(click.style('Filmalize Actions:', fg='cyan', bold=True))
         for stream in self.streams:
             if stream.index in self.selected:
                 header = 'Stream {}: '.format(stream.index)
                 stream.build_options()
                 info = stream.option_summary
-                click.echo(click.style(header, fg='green', bold=True)
-                           + click.style(info, fg='yellow'))
+                lines.append(click.style(header, fg='green', bold=True)
+                             + click.style(info, fg='yellow'))
         for subtitle in self.subtitle_files:
-            click.echo(
+            lines.append(
                 click.style(subtitle.file_name + ': ', fg='green', bold=True)
                 + click.style(subtitle.option_summary, fg='yellow')
             )
-        click.secho('Output File: {}'.format(self.output_name), fg='magenta')
+        lines.append(click.style('Output File: {}'.format(self.output_name),
+                                 fg='magenta'))
+        return lines
+
+    def display(self):
+        """Echo a pretty representation of this Container."""
+        click.echo('\n'.join(self.describe()))
+
+    def display_conversion(self):
+        """Echo a pretty representation of the conversion actions to perform on
+        this Container."""
 
-    def display_command(self):
-        """Echo the current compiled command for this Container."""
+        click.clear()
+        click.echo('\n'.join(self.describe_conversion()))
 
-        self.display_conversion()
-        click.secho('Command:', fg='cyan', bold=True)
-        click.echo(' '.join(self.build_command()))
+    def display_command(self, command=None):
+        """Echo the current compiled command for this Container.
+
+        Args:
+            command (:obj:`list` of :obj:`str`, optional): A previously built
+                command for this Container. If not specified, the command will
+                be built.
+
+        """
+
+        click.clear()
+        lines = self.describe_conversion()
+        lines.append(click.style('Command:', fg='cyan', bold=True))
+        lines.append(' '.join(command if command else self.build_command()))
+        click.echo('\n'.join(lines))
 
 
 class CliStream(Stream):
@@ -266,18 +379,23 @@ class CliStream(Stream):
 
     """
 
-    def display(self):
-        """Echo a pretty representation of this Stream."""
+    def describe(self):
+        """Build a pretty representation of this Stream.
+
+        Returns:
+            :obj:`list` of :obj:`str`: The styled lines of the representation.
+
+        """
 
         stream_header = 'Stream {}:'.format(self.index)
         stream_info = [self.type, self.codec]
         stream_info.append(self.labels.language)
         stream_info.append(self.labels.default)
-        click.echo('  ' + click.style(stream_header, fg='green', bold=True)
-                   + ' ' + click.style(' '.join(stream_info), fg='yellow'))
+        lines = ['  ' + click.style(stream_header, fg='green', bold=True)
+                 + ' ' + click.style(' '.join(stream_info), fg='yellow')]
 
         if self.labels.title:
-            click.echo('    Title: {}'.format(self.labels.title))
+            lines.append('    Title: {}'.format(self.labels.title))
 
         stream_specs = []
         if self.type == 'video':
@@ -288,7 +406,13 @@ class CliStream(Stream):
             stream_specs.append('Channels: {}'.format(self.labels.channels))
             stream_specs.append('Bitrate: {}Kib/s'.format(self.labels.bitrate))
         if stream_specs:
-            click.echo('    ' + ' | '.join(stream_specs))
+            lines.append('    ' + ' | '.join(stream_specs))
+
+        return lines
+
+    def display(self):
+        """Echo a pretty representation of this Stream."""
+        click.echo('\n'.join(self.describe()))
 
 
 class CliSubFile(SubtitleFile):
@@ -299,8 +423,34 @@ class CliSubFile(SubtitleFile):
 
     """
 
+    def describe(self):
+        """Build a pretty representation of this subtitle file.
+
+        Returns:
+            :obj:`list` of :obj:`str`: The styled lines of the representation.
+
+        """
+
+        return [click.style('Subtitle File: {}'.format(self.file_name),
+                            fg='magenta'),
+                '  Encoding: {}'.format(self.encoding)]
+
     def display(self):
         """Echo a pretty representation of this subtitle file."""
+        click.echo('\n'.join(self.describe()))
+
+
+def _clock(seconds):
+    """Format a number of seconds as hours, minutes and seconds.
+
+    Args:
+        seconds (:obj:`float`): The number of seconds.
+
+    Returns:
+        :obj:`str`: The time in H:MM:SS format.
+
+    """
 
-        click.secho('Subtitle File: {}'.format(self.file_name), fg='magenta')
-        click.echo('  Encoding: {}'.format(self.encoding))
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return '{}:{:02}:{:02}'.format(hours, minutes, seconds)
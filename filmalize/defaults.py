@@ -1,5 +1,8 @@
 """Default global variables for filmalize."""
 
+import os
+
+
 FFPROBE = '/usr/bin/ffprobe'
 FFMPEG = '/usr/bin/ffmpeg'
 ENDING = '.mp4'
@@ -9,3 +12,14 @@ C_SUBS = 'mov_text'
 BITRATE = 384
 CRF = 18
 PRESET = 'slow'
+PROBE_CACHE = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+    'filmalize', 'probe.json'
+)
+# The most probe results to keep, dropping those least recently used.
+PROBE_CACHE_SIZE = 10000
+# Files converted at once, each given a few cores to keep x264 efficient.
+MAX_CONVERSIONS = max(1, (os.cpu_count() or 1) // 4)
+# ffmpeg threads per conversion, or None to share the cores equally between
+# the conversions running at the same time.
+THREADS = None
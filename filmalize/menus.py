@@ -7,46 +7,57 @@ uses to select the streams to transcode and/or edit transcoding parameters.
 
 import sys
 import os
-import pathlib
 
 import click
 
 import filmalize.defaults as defaults
 from filmalize.errors import UserCancelError
-from filmalize.cli_models import SelectStreams, CliSubFile
+from filmalize.cli_models import SelectStreams
 
 
-def main_menu(containers):
+def main_menu(containers, limit):
     """The main menu, which is loaded when running the convert command.
 
     The main menu is presented for each container given, preceeded by a pretty
     representation of the container and a description of the actions to be
     taken. The user may select from the options Convert, Skip, Edit, and Quit.
     If convert is selected, the conversion is started immediately in a
-    subprocess. However, those processes will be terminated if Quit is
-    subsequently selected. If the user selects Edit, the edit menu is loaded.
+    subprocess, unless the limit of conversions are already running or an
+    earlier approved conversion is still waiting to start, in which case it is
+    left for the convert command to start, in order, once another conversion
+    has finished. A conversion started before the last container is given its
+    share of the cores for the limit of concurrent conversions, since more may
+    be approved, and one started for the last container shares them only with
+    those still running. However, any started processes will be terminated if
+    Quit is subsequently selected. If the user selects Edit, the edit menu is
+    loaded.
 
     Args:
-        containers (:obj:`list` of :obj:`Container`): Candidates for
-            conversion.
+        containers (iterable of :obj:`Container`): Candidates for conversion.
+        limit (:obj:`int`): The number of conversions to run at once.
 
     Returns:
         :obj:`list` of :obj:`Container`: The instances that were approved by
-        the user and started.
+        the user, whether or not they have been started.
 
     """
 
     running = []
-    for container in containers:
+    for container, last in _with_last(containers):
         menu = 'main'
         while True:
             if menu == 'main':
                 container.display_conversion()
 
-                menu = multiple_choice('Main Menu:', ['c', 's', 'e', 'q'],
+                menu = multiple_choice('Main Menu', ['c', 's', 'e', 'q'],
                                        'Convert/Skip/Edit/Quit')
             elif menu == 'c':
-                container.convert()
+                started = [approved for approved in running
+                           if approved.process
+                           and approved.process.poll() is None]
+                queued = any(not approved.process for approved in running)
+                if not queued and len(started) < limit:
+                    container.convert(len(started) + 1 if last else limit)
                 running.append(container)
                 break
             elif menu == 's':
@@ -56,7 +67,8 @@ def main_menu(containers):
                 menu = 'main'
             elif menu == 'q':
                 for running_container in running:
-                    running_container.process.terminate()
+                    if running_container.process:
+                        running_container.process.terminate()
                 sys.exit('Conversion cancelled.')
 
     return running
@@ -67,24 +79,30 @@ def edit_menu(container):
 
     The user may elect to edit the :obj:`Stream` or :obj:`SubtitleFile`
     instances associated with the given :obj:`Container`, change the ouput
-    filename, display the raw ffmpeg command, or return to the main menu.
+    filename, display the raw ffmpeg command, or return to the main menu. The
+    command is only rebuilt for display after one of the other menus, which
+    may have changed it, has been visited.
 
     Args:
         container (:obj:`Container`): The Container instance to edit.
 
     """
     menu = 'edit'
+    command = None
     while True:
         if menu == 'edit':
-            menu = multiple_choice('Edit Menu:', ['e', 's', 'f', 'd', 'm'],
+            menu = multiple_choice('Edit Menu', ['e', 's', 'f', 'd', 'm'],
                                    'Edit Streams/Subtitle Files/'
                                    'Change Filename/Display Command/Main Menu')
         elif menu == 'm':
             break
         elif menu == 'd':
-            container.display_command()
+            if command is None:
+                command = container.build_command()
+            container.display_command(command)
             menu = 'edit'
         else:
+            command = None
             options = {'e': stream_menu, 's': subtitle_menu,
                        'f': change_file_name}
             try:
@@ -108,7 +126,7 @@ def stream_menu(container):
     """
 
     container.display_conversion()
-    menu = multiple_choice('Stream Menu:', ['s', 'e', 'c'],
+    menu = multiple_choice('Stream Menu', ['s', 'e', 'c'],
                            'Select Active Streams/Edit Stream/Cancel')
     if menu == 'c':
         return
@@ -130,7 +148,7 @@ def subtitle_menu(container):
     """
 
     container.display_conversion()
-    menu = multiple_choice('Subtitle File Menu:', ['a', 'r', 'e', 'c'],
+    menu = multiple_choice('Subtitle File Menu', ['a', 'r', 'e', 'c'],
                            'Add/Remove/Change Encoding/Cancel')
     if menu == 'c':
         return
@@ -144,8 +162,8 @@ def yes_no(prompt):
     """Utility function to ask the user a yes/no question.
 
     Note:
-        The user must enter 'y' or 'n', and will be prompted repeatedly until
-        they do so.
+        The user must enter 'y' or 'n', which are listed after the prompt,
+        and will be prompted repeatedly until they do so.
 
     Args:
         prompt (:obj:`str`): The question to ask the user.
@@ -155,16 +173,9 @@ def yes_no(prompt):
         'n'.
 
     """
-    while True:
-        click.echo(prompt + ' [y/n]', nl=False)
-        char = click.getchar()
-        click.echo()
-        if char == 'y':
-            return True
-        elif char == 'n':
-            return False
-        else:
-            click.echo('Invalid input, try again...')
+
+    return click.prompt(prompt, type=click.Choice(['y', 'n']),
+                        show_choices=True) == 'y'
 
 
 def multiple_choice(prompt, responses, key=None):
@@ -178,7 +189,7 @@ def multiple_choice(prompt, responses, key=None):
         prompt (:obj:`str`): The question to ask the user.
         responses (:obj:`list` of :obj:`str`): The possible answers to the
             question in the form of individual characters. The characters will
-            be displayed to the user separated by '/' characters.
+            be displayed to the user as the available choices.
         key (:obj:`str`, optional): A key to relate the characters in the
             responses list to answers to the prompt.
 
@@ -188,19 +199,12 @@ def multiple_choice(prompt, responses, key=None):
 
     """
 
-    while True:
-        click.echo()
-        options = ' ' + '/'.join(responses)
-        click.echo(click.style('*** ' + prompt, fg='blue', bg='white',
-                               bold=True) + options)
-        if key:
-            click.echo(click.style('Key: ', fg='red') + key)
-        char = click.getchar()
-        click.echo()
-        if char in responses:
-            return char
-        else:
-            click.echo('Invalid input, try again...')
+    click.echo()
+    if key:
+        click.echo(click.style('Key: ', fg='red') + key)
+    return click.prompt(click.style('*** ' + prompt, fg='blue', bg='white',
+                                    bold=True),
+                        type=click.Choice(responses), show_choices=True)
 
 
 def add_subtitles(container):
@@ -220,7 +224,7 @@ def add_subtitles(container):
     except click.exceptions.Abort:
         raise UserCancelError('Cancelled adding subtitle file.')
 
-    container.subtitle_files.append(CliSubFile(sub_file))
+    container.add_subtitle_file(sub_file)
 
 
 def remove_subtitles(container):
@@ -242,7 +246,7 @@ def remove_subtitles(container):
         file_indices = [str(i) for i in range(len(container.subtitle_files))]
         acceptable = file_indices + ['c']
         action = multiple_choice('Enter the file number to remove, or c to '
-                                 'cancel:', acceptable)
+                                 'cancel', acceptable)
         if action == 'c':
             raise UserCancelError('Cancelled subtitle file removal.')
         else:
@@ -268,7 +272,7 @@ def change_subtitle_encoding(container):
         file_indices = [str(i) for i in range(len(container.subtitle_files))]
         acceptable = file_indices + ['c']
         action = multiple_choice('Enter the file number to change, or c to '
-                                 'cancel:', acceptable)
+                                 'cancel', acceptable)
         if action == 'c':
             raise UserCancelError('Cancelled subtitle file removal.')
         else:
@@ -312,7 +316,7 @@ def edit_stream_options(container):
 
     try:
         stream = container.streams_dict[
-            int(multiple_choice('Select a stream:', indexes))
+            int(multiple_choice('Select a stream', indexes))
         ]
         if stream.type == 'video':
             if stream.codec == 'h264' and yes_no('Copy stream?'):
@@ -350,7 +354,7 @@ def change_file_name(container):
 
     """
 
-    default = pathlib.PurePath(container.file_name).stem + defaults.ENDING
+    default = container.default_name
     try:
         if yes_no('Use default file name ({})?'.format(default)):
             container.output_name = default
@@ -359,3 +363,24 @@ def change_file_name(container):
             container.output_name = name + defaults.ENDING
     except click.exceptions.Abort:
         raise UserCancelError('Cancelled editing file name.')
+
+
+def _with_last(iterable):
+    """Utility generator to pair each item of an iterable with whether it is
+    the last one.
+
+    Args:
+        iterable (iterable): The items to yield.
+
+    Yields:
+        :obj:`tuple` of (item, :obj:`bool`): Each item and whether it is the
+        last.
+
+    """
+
+    iterator = iter(iterable)
+    for item in iterator:
+        for following in iterator:
+            yield item, False
+            item = following
+        yield item, True
@@ -8,18 +8,62 @@ class is the :obj:`Container`, which may be created manually, or with the
 """
 
 import os
-import datetime
+import re
+import atexit
+import shutil
 import tempfile
 import subprocess
 import json
-import pathlib
+import threading
 
-import chardet
-import bitmath
+try:
+    import cchardet as chardet
+except ImportError:
+    import chardet
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
 
 import filmalize.defaults as defaults
 from filmalize.errors import ProbeError, ProgressFinishedError
 
+# Constant ffmpeg option fragments shared by every Stream.build_options call.
+# Configurable values such as defaults.PRESET are read when options are built.
+_YUV_OPTS = ('-pix_fmt', 'yuv420p')
+_COPY_OPTS = ('copy',)
+
+# The ffprobe fields read by the from_dict methods; nothing else is probed.
+_PROBE_ENTRIES = ('format=filename,duration,size,bit_rate,format_long_name'
+                  ':format_tags=title'
+                  ':stream=index,codec_type,codec_name,bit_rate,width,height,'
+                  'coded_width,coded_height,channel_layout'
+                  ':stream_tags=title,language'
+                  ':stream_disposition=default')
+
+# Binary unit divisors for bitrates in Kib/s and Mib/s and sizes in MiB.
+_KIBI = 1 << 10
+_MEBI = 1 << 20
+
+# Matches the processed time values in ffmpeg progress output.
+_OUT_TIME_RE = re.compile(rb'^out_time_ms=(\d+)$', re.MULTILINE)
+
+# The directory holding every Container's progress file, created on first use.
+_PROGRESS_DIR = None
+_PROGRESS_DIR_LOCK = threading.Lock()
+
+# ffprobe results loaded from defaults.PROBE_CACHE, keyed by absolute path,
+# with the paths probed since it was loaded.
+_PROBE_CACHE = None
+_PROBE_CACHE_ADDED = set()
+_PROBE_CACHE_LOCK = threading.Lock()
+
+# A single encoding detector, reset and reused for each subtitle file.
+_DETECTOR = chardet.UniversalDetector()
+
+# The most bytes of a subtitle file to examine when guessing its encoding.
+_ENCODING_SAMPLE = 65536
+
 
 class EqualityMixin(object):
     """Mixin class that adds equality checking.
@@ -59,16 +103,15 @@ class ContainerLabel(EqualityMixin):
         size (:obj:`float`, optional): Container file size in MiBs.
         bitrate (:obj:`float`, optional): Container overall bitrate in Mib/s.
         container_format (:obj:`str`, optional): Container file format.
-        length (:obj:`datetime.timedelta`, optional): The duration of the file
-            as a timedelta.
+        length (:obj:`str`, optional): The duration of the file formatted as
+            H:MM:SS.
 
     Attributes:
         title (:obj:`str`): Container title.
         size (:obj:`float`): Container file size in MiBs.
         bitrate (:obj:`float`): Container overall bitrate in Mib/s.
         container_format (:obj:`str`): Container file format.
-        length (:obj:`datetime.timedelta`): The duration of the file as a
-            timedelta.
+        length (:obj:`str`): The duration of the file formatted as H:MM:SS.
 
 
     """
@@ -94,14 +137,17 @@ class ContainerLabel(EqualityMixin):
             Instance populated wtih data from the given dictionary.
 
         """
-        title = info.get('format', {}).get('tags', {}).get('title', '')
-        f_bytes = int(info.get('format', {}).get('size', 0))
-        size = round(bitmath.MiB(bytes=f_bytes).value, 2) if f_bytes else ''
-        bits = int(info.get('format', {}).get('bit_rate', 0))
-        bitrate = round(bitmath.Mib(bits=bits).value, 2) if bits else ''
-        container_format = info.get('format', {}).get('format_long_name', '')
-        duration = float(info.get('format', {}).get('duration', 0))
-        length = datetime.timedelta(0, round(duration)) if duration else ''
+        format_info = info.get('format', {})
+        title = format_info.get('tags', {}).get('title', '')
+        f_bytes = int(format_info.get('size', 0))
+        size = round(f_bytes / _MEBI, 2) if f_bytes else ''
+        bits = int(format_info.get('bit_rate', 0))
+        bitrate = round(bits / _MEBI, 2) if bits else ''
+        container_format = format_info.get('format_long_name', '')
+        duration = float(format_info.get('duration', 0))
+        seconds = round(duration)
+        length = ('{}:{:02}:{:02}'.format(seconds // 3600, seconds // 60 % 60,
+                                          seconds % 60) if duration else '')
 
         return cls(title=title, size=size, bitrate=bitrate,
                    container_format=container_format, length=length)
@@ -141,10 +187,16 @@ class Container(EqualityMixin):
             file.
         microseconds (:obj:`int`): The duration of the file expressed in
             microseconds.
-        temp_file (:obj:`tempfile.NamedTemporaryFile`): The temporary file for
-            ffmpeg to write status information to.
+        temp_file (:obj:`tempfile.NamedTemporaryFile`): The unbuffered
+            temporary file for ffmpeg to write status information to, created
+            when the conversion is started. The progress files of all
+            Containers share a single temporary directory, which is removed
+            when the interpreter exits.
         process (:obj:`subprocess.Popen`): The subprocess in which ffmpeg
             processes the file.
+        progress_offset (:obj:`int`): The number of bytes of
+            :obj:`Container.temp_file` that have been read for progress
+            information.
         equality_ignore (:obj:`list` of :obj:`string`): Attributes to ignore
             when checking for equality of Container instances.
 
@@ -163,8 +215,10 @@ class Container(EqualityMixin):
         self.labels = labels if labels else ContainerLabel()
 
         self.microseconds = int(duration * 1000000)
-        self.temp_file = tempfile.NamedTemporaryFile(delete=False)
+        self.temp_file = None
         self.process = None
+        self.progress_offset = 0
+        self._progress = 0
         self.equality_ignore = ['temp_file', 'process']
 
     @classmethod
@@ -172,8 +226,11 @@ class Container(EqualityMixin):
         """Build a :obj:`Container` from a given multimedia file.
 
         Attempt to probe the file with ffprobe. If the probe is succesful,
-        finish instatiation by passing the results to
-        :obj:`Container.from_dict`.
+        finish instatiation by passing the results, parsed with orjson if it
+        is installed, to :obj:`Container.from_dict`. Probe results are cached
+        by the path, modification time, and size of the file, and ffprobe is
+        not run again for a file that has not changed. Call
+        :obj:`save_probe_cache` to keep the cached results for later runs.
 
         Args:
             file_name (:obj:`str`): The file (a multimedia container) to
@@ -188,16 +245,33 @@ class Container(EqualityMixin):
 
         """
 
+        key, stamp = _probe_cache_key(file_name)
+        entry = None
+        if key:
+            cache = _load_probe_cache()
+            with _PROBE_CACHE_LOCK:
+                entry = cache.pop(key, None)
+                if entry:
+                    cache[key] = entry
+        if entry and entry['stamp'] == stamp:
+            info = dict(entry['info'])
+            info['format'] = dict(info['format'], filename=file_name)
+            return cls.from_dict(info)
+
         probe_response = subprocess.run(
-            [defaults.FFPROBE, '-v', 'error', '-show_format',
-             '-show_streams', '-of', 'json', file_name],
+            [defaults.FFPROBE, '-v', 'error', '-show_entries',
+             _PROBE_ENTRIES, '-of', 'json', file_name],
             stdout=subprocess.PIPE, stderr=subprocess.PIPE
         )
         if probe_response.returncode:
             raise ProbeError(file_name, probe_response.stderr.decode('utf-8')
                              .strip(os.linesep))
 
-        info = json.loads(probe_response.stdout)
+        info = json_loads(probe_response.stdout)
+        if key:
+            with _PROBE_CACHE_LOCK:
+                cache[key] = {'stamp': stamp, 'info': info}
+                _PROBE_CACHE_ADDED.add(key)
         return cls.from_dict(info)
 
     @classmethod
@@ -232,7 +306,8 @@ class Container(EqualityMixin):
         """:obj:`str`: The input filename reformatted with the selected output
         file extension."""
 
-        return pathlib.PurePath(self.file_name).stem + defaults.ENDING
+        stem = os.path.splitext(os.path.basename(self.file_name))[0]
+        return stem + defaults.ENDING
 
     @property
     def default_streams(self):
@@ -293,6 +368,13 @@ class Container(EqualityMixin):
     def progress(self):
         """:obj:`int`: The number of microseconds that ffmpeg has processed.
 
+        Note:
+            Only the complete lines that ffmpeg has written to
+            :obj:`Container.temp_file` since the last check are read, and the
+            file is not read at all if it has not grown. New bytes are read
+            from the file descriptor with a single :obj:`os.pread`. If there
+            is no new value, the last value read is returned.
+
         Raises:
             :obj:`ProgressFinishedError`: If the subprocess is not running
                 (either finished or errored out).
@@ -303,20 +385,21 @@ class Container(EqualityMixin):
         elif self.process.poll() is not None:
             raise ProgressFinishedError
         else:
-            try:
-                self.temp_file.seek(-512, os.SEEK_END)
-            except OSError:
-                self.temp_file.seek(0)
-            binary_lines = self.temp_file.readlines(512)
-            line_list = [_l.decode().strip(os.linesep) for _l in binary_lines]
+            status_fd = self.temp_file.fileno()
+            size = os.fstat(status_fd).st_size
+            if size <= self.progress_offset:
+                return self._progress
+
+            status = os.pread(status_fd, size - self.progress_offset,
+                              self.progress_offset)
+            end = status.rfind(b'\n') + 1
+            self.progress_offset += end
 
-            microsec = 0
-            for line in reversed(line_list):
-                if line.split('=')[0] == 'out_time_ms':
-                    microsec = int(line.split('=')[1])
-                    break
+            matches = _OUT_TIME_RE.findall(status, 0, end)
+            if matches:
+                self._progress = int(matches[-1])
 
-            return microsec
+            return self._progress
 
     def add_subtitle_file(self, file_name, encoding=None):
         """Add an external subtitle file. Optionally set a custom file
@@ -330,20 +413,40 @@ class Container(EqualityMixin):
 
         self.subtitle_files.append(SubtitleFile(file_name, encoding))
 
-    def convert(self):
-        """Start the conversion of this container in a subprocess."""
+    def convert(self, concurrent=1):
+        """Start the conversion of this container in a subprocess.
+
+        The progress file is only created now, so that containers which are
+        displayed or skipped do not hold one open.
+
+        Args:
+            concurrent (:obj:`int`, optional): The number of conversions,
+                including this one, that will run at the same time.
+
+        """
 
+        self.temp_file = tempfile.NamedTemporaryFile(
+            dir=_progress_dir(), delete=False, buffering=0
+        )
         self.process = subprocess.Popen(
-            self.build_command(),
+            self.build_command(concurrent),
             stderr=subprocess.PIPE,
-            universal_newlines=True
+            bufsize=0
         )
 
-    def build_command(self):
+    def build_command(self, concurrent=1):
         """Build the ffmpeg command to process this container.
 
         Generate appropriate ffmpeg options to process the streams selected in
-        :obj:`self.selected`.
+        :obj:`self.selected`. Each ffmpeg process is limited to
+        :obj:`defaults.THREADS` threads or, if that is not set, to an equal
+        share of the cores between the conversions running at the same time.
+        ffmpeg is only told to write its progress once the conversion has been
+        started and :obj:`Container.temp_file` has been created.
+
+        Args:
+            concurrent (:obj:`int`, optional): The number of conversions,
+                including this one, that will run at the same time.
 
         Returns:
             :obj:`list` of :obj:`str`: The ffmpeg command and options to
@@ -351,9 +454,10 @@ class Container(EqualityMixin):
 
         """
 
-        command = [defaults.FFMPEG, '-nostdin', '-progress',
-                   self.temp_file.name, '-v', 'error', '-y', '-i',
-                   self.file_name]
+        command = [defaults.FFMPEG, '-nostdin']
+        if self.temp_file:
+            command.extend(['-progress', self.temp_file.name])
+        command.extend(['-v', 'error', '-y', '-i', self.file_name])
         for subtitle in self.subtitle_files:
             command.extend(['-sub_charenc', subtitle.encoding, '-i',
                             subtitle.file_name])
@@ -370,7 +474,8 @@ class Container(EqualityMixin):
             command.extend(['-c:s:{}'.format(stream_number['subtitle'])])
             command.extend(subtitle.options)
             stream_number['subtitle'] += 1
-        command.extend([os.path.join(os.path.dirname(self.file_name),
+        command.extend(['-threads', str(_conversion_threads(concurrent)),
+                        os.path.join(os.path.dirname(self.file_name),
                                      self.output_name)])
 
         return command
@@ -432,18 +537,19 @@ class StreamLabel(EqualityMixin):
         """
 
         stream_type = info['codec_type']
-        title = info.get('tags', {}).get('title', '')
+        tags = info.get('tags', {})
+        title = tags.get('title', '')
         bits = int(info.get('bit_rate', 0))
         if stream_type == 'video' and bits:
-            bitrate = round(bitmath.Mib(bits=bits).value, 2)
+            bitrate = round(bits / _MEBI, 2)
         elif stream_type == 'audio' and bits:
-            bitrate = round(bitmath.Kib(bits=bits).value)
+            bitrate = round(bits / _KIBI)
         else:
             bitrate = ''
         height = str(info.get('height', info.get('coded_height', '')))
         width = str(info.get('width', info.get('coded_width', '')))
         resolution = width + 'x' + height if height and width else ''
-        language = info.get('tags', {}).get('language', '')
+        language = tags.get('language', '')
         channels = info.get('channel_layout', '')
         default = bool(info.get('disposition', {}).get('default'))
 
@@ -507,6 +613,8 @@ class Stream(EqualityMixin):
             :obj:`StreamLabel`.
         labels (:obj:`StreamLabel`): Informational metadata about the
             input stream.
+        equality_ignore (:obj:`list` of :obj:`string`): Attributes to ignore
+            when checking for equality of Stream instances.
 
     """
 
@@ -521,6 +629,8 @@ class Stream(EqualityMixin):
         self.labels = labels if labels else StreamLabel()
 
         self.option_summary = None
+        self._options = {}
+        self.equality_ignore = ['_options']
 
     @classmethod
     def from_dict(cls, info):
@@ -549,7 +659,9 @@ class Stream(EqualityMixin):
 
         The options generated will use custom values for video CRF or audio
         bitrate, if specified, or the default values. The option_summary is
-        updated to reflect the selected options.
+        updated to reflect the selected options. Generated options are cached,
+        and only regenerated when the stream number or the values they are
+        based on have changed.
 
         Args:
             number (:obj:`int`, optional): The number of Streams of this type
@@ -560,42 +672,86 @@ class Stream(EqualityMixin):
 
         """
 
-        options = []
-        if self.type == 'video':
-            options.extend(['-c:v:{}'.format(number)])
-            if self.custom_crf or self.codec != defaults.C_VIDEO:
-                crf = (self.custom_crf if self.custom_crf
-                       else defaults.CRF)
-                options.extend(['libx264', '-preset', defaults.PRESET, '-crf',
-                                str(crf), '-pix_fmt', 'yuv420p'])
-                self.option_summary = ('transcode -> {}, crf={}'
-                                       .format(defaults.C_VIDEO, crf))
-            else:
-                options.extend(['copy'])
-                self.option_summary = 'copy'
-        elif self.type == 'audio':
-            options.extend(['-c:a:{}'.format(number)])
-            if self.custom_bitrate or self.codec != defaults.C_AUDIO:
-                bitrate = (self.custom_bitrate if self.custom_bitrate
-                           else self.labels.bitrate if self.labels.bitrate
-                           else defaults.BITRATE)
-                options.extend([defaults.C_AUDIO, '-b:a:{}'.format(number),
-                                '{}k'.format(bitrate)])
-                self.option_summary = ('transcode -> {}, bitrate={}Kib/s'
-                                       .format(defaults.C_AUDIO, bitrate))
-            else:
-                options.extend(['copy'])
-                self.option_summary = 'copy'
-        elif self.type == 'subtitle':
-            options.extend(['-c:s:{}'.format(number)])
-            if self.codec == defaults.C_SUBS:
-                options.extend(['copy'])
-                self.option_summary = 'copy'
-            else:
-                options.extend([defaults.C_SUBS])
-                self.option_summary = 'transcode -> {}'.format(defaults.C_SUBS)
-
-        return options
+        key = (number, self.codec, self.custom_crf, self.custom_bitrate,
+               self.labels.bitrate, defaults.PRESET, defaults.CRF,
+               defaults.BITRATE)
+        if key not in self._options:
+            self._options[key] = _OPTION_BUILDERS[self.type](self, number)
+        options, self.option_summary = self._options[key]
+        return list(options)
+
+
+def _build_video_options(stream, number):
+    """Generate ffmpeg options and a summary for a video :obj:`Stream`.
+
+    Args:
+        stream (:obj:`Stream`): The video stream.
+        number (:obj:`int`): The output number of this video stream.
+
+    Returns:
+        :obj:`tuple` of (:obj:`tuple` of :obj:`str`, :obj:`str`): The ffmpeg
+        options and the option summary.
+
+    """
+
+    codec = ('-c:v:{}'.format(number),)
+    if stream.custom_crf or stream.codec != defaults.C_VIDEO:
+        crf = stream.custom_crf if stream.custom_crf else defaults.CRF
+        return (codec + ('libx264', '-preset', defaults.PRESET,
+                         '-crf', str(crf)) + _YUV_OPTS,
+                'transcode -> {}, crf={}'.format(defaults.C_VIDEO, crf))
+    return codec + _COPY_OPTS, 'copy'
+
+
+def _build_audio_options(stream, number):
+    """Generate ffmpeg options and a summary for an audio :obj:`Stream`.
+
+    Args:
+        stream (:obj:`Stream`): The audio stream.
+        number (:obj:`int`): The output number of this audio stream.
+
+    Returns:
+        :obj:`tuple` of (:obj:`tuple` of :obj:`str`, :obj:`str`): The ffmpeg
+        options and the option summary.
+
+    """
+
+    codec = ('-c:a:{}'.format(number),)
+    if stream.custom_bitrate or stream.codec != defaults.C_AUDIO:
+        bitrate = (stream.custom_bitrate if stream.custom_bitrate
+                   else stream.labels.bitrate if stream.labels.bitrate
+                   else defaults.BITRATE)
+        return (codec + (defaults.C_AUDIO, '-b:a:{}'.format(number),
+                         '{}k'.format(bitrate)),
+                'transcode -> {}, bitrate={}Kib/s'.format(defaults.C_AUDIO,
+                                                          bitrate))
+    return codec + _COPY_OPTS, 'copy'
+
+
+def _build_subtitle_options(stream, number):
+    """Generate ffmpeg options and a summary for a subtitle :obj:`Stream`.
+
+    Args:
+        stream (:obj:`Stream`): The subtitle stream.
+        number (:obj:`int`): The output number of this subtitle stream.
+
+    Returns:
+        :obj:`tuple` of (:obj:`tuple` of :obj:`str`, :obj:`str`): The ffmpeg
+        options and the option summary.
+
+    """
+
+    codec = ('-c:s:{}'.format(number),)
+    if stream.codec == defaults.C_SUBS:
+        return codec + _COPY_OPTS, 'copy'
+    return (codec + (defaults.C_SUBS,),
+            'transcode -> {}'.format(defaults.C_SUBS))
+
+
+# The option builder for each supported stream type.
+_OPTION_BUILDERS = {'video': _build_video_options,
+                    'audio': _build_audio_options,
+                    'subtitle': _build_subtitle_options}
 
 
 class SubtitleFile(EqualityMixin):
@@ -623,14 +779,161 @@ class SubtitleFile(EqualityMixin):
     def guess_encoding(self):
         """Guess the encoding of the subtitle file.
 
-        Open the given file, read a line, and pass that line to
-        :obj:`chardet.detect` to produce a guess at the file's encoding.
+        Open the given file, read a sample from the start of it, and feed it
+        to a shared :obj:`chardet.UniversalDetector` to produce a guess at the
+        file's encoding. The faster cchardet detector is used if it is
+        installed.
 
         Returns:
             str: The best guess for the subtitle file encoding.
 
         """
         with open(self.file_name, mode='rb') as _file:
-            lines = [_file.readline() for _ in range(10)]
-        detected = chardet.detect(b''.join(lines))
-        return detected['encoding']
+            sample = _file.read(_ENCODING_SAMPLE)
+        return _detect_encoding(sample)
+
+
+def _detect_encoding(sample):
+    """Guess the encoding of a sample of bytes.
+
+    The module level :obj:`chardet.UniversalDetector` is reset and reused
+    rather than building a new detector for every sample. The sample is fed
+    to the detector a line at a time, stopping as soon as it is confident.
+
+    Args:
+        sample (:obj:`bytes`): The bytes to examine.
+
+    Returns:
+        str: The best guess for the encoding of the sample.
+
+    """
+
+    _DETECTOR.reset()
+    for line in sample.splitlines(keepends=True):
+        _DETECTOR.feed(line)
+        if _DETECTOR.done:
+            break
+    _DETECTOR.close()
+    return _DETECTOR.result['encoding']
+
+
+def _progress_dir():
+    """Create the shared directory for progress files the first time it is
+    needed, and arrange for it to be removed at exit.
+
+    Returns:
+        :obj:`str`: The path of the directory.
+
+    """
+
+    global _PROGRESS_DIR
+    with _PROGRESS_DIR_LOCK:
+        if _PROGRESS_DIR is None:
+            _PROGRESS_DIR = tempfile.mkdtemp(prefix='filmalize-')
+            atexit.register(shutil.rmtree, _PROGRESS_DIR, ignore_errors=True)
+    return _PROGRESS_DIR
+
+
+def _conversion_threads(concurrent):
+    """Find the number of threads an ffmpeg conversion may use.
+
+    Args:
+        concurrent (:obj:`int`): The number of conversions, including this
+            one, that will run at the same time.
+
+    Returns:
+        :obj:`int`: :obj:`defaults.THREADS` if set, otherwise the number of
+        cores divided between the concurrent conversions.
+
+    """
+
+    if defaults.THREADS:
+        return defaults.THREADS
+    return max(1, (os.cpu_count() or 1) // max(1, concurrent))
+
+
+def _probe_cache_key(file_name):
+    """Build the probe cache key and stamp for a file.
+
+    Args:
+        file_name (:obj:`str`): The file to build a key for.
+
+    Returns:
+        :obj:`tuple`: The absolute path of the file and a :obj:`list` of its
+        modification time in nanoseconds and size, or (None, None) if the
+        cache is disabled or the file cannot be examined.
+
+    """
+
+    if not defaults.PROBE_CACHE:
+        return None, None
+    try:
+        stat = os.stat(file_name)
+    except OSError:
+        return None, None
+    return os.path.abspath(file_name), [stat.st_mtime_ns, stat.st_size]
+
+
+def _load_probe_cache():
+    """Load the ffprobe result cache from disk the first time it is needed.
+
+    A cache written with different :obj:`_PROBE_ENTRIES` holds different
+    fields, so it is discarded.
+
+    Returns:
+        :obj:`dict`: Cache entries keyed by absolute file path.
+
+    """
+
+    global _PROBE_CACHE
+    with _PROBE_CACHE_LOCK:
+        if _PROBE_CACHE is None:
+            _PROBE_CACHE_ADDED.clear()
+            try:
+                with open(defaults.PROBE_CACHE, 'rb') as cache_file:
+                    saved = json_loads(cache_file.read())
+                if saved['entries'] != _PROBE_ENTRIES:
+                    raise ValueError('Probe cache entries have changed.')
+                _PROBE_CACHE = saved['files']
+            except (OSError, ValueError, KeyError, TypeError):
+                _PROBE_CACHE = {}
+    return _PROBE_CACHE
+
+
+def save_probe_cache():
+    """Write the ffprobe result cache to disk.
+
+    Entries are not stat'ed again here: an entry is only used if its stamp
+    matches the file when it is looked up, and is replaced when a changed
+    file is probed again. Entries are kept in the order they were last used,
+    and only the :obj:`defaults.PROBE_CACHE_SIZE` most recently used are
+    written, so entries for files that have been moved or deleted are
+    eventually dropped. The cache file is replaced atomically, so concurrent
+    runs of filmalize never read a partially written cache. Nothing is written
+    if the cache is disabled or no file has been probed since it was loaded.
+
+    """
+
+    if not defaults.PROBE_CACHE or _PROBE_CACHE is None:
+        return
+    with _PROBE_CACHE_LOCK:
+        if not _PROBE_CACHE_ADDED:
+            return
+        files = list(_PROBE_CACHE.items())
+        files = files[max(0, len(files) - defaults.PROBE_CACHE_SIZE):]
+        cache = {'entries': _PROBE_ENTRIES, 'files': dict(files)}
+        _PROBE_CACHE_ADDED.clear()
+    directory = os.path.dirname(defaults.PROBE_CACHE)
+    cache_file = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with tempfile.NamedTemporaryFile('w', dir=directory,
+                                         delete=False) as cache_file:
+            json.dump(cache, cache_file)
+        os.replace(cache_file.name, defaults.PROBE_CACHE)
+    except OSError:
+        if cache_file:
+            try:
+                os.unlink(cache_file.name)
+            except OSError:
+                pass
@@ -0,0 +1,143 @@
+"""Conversion supervisor for filmalize.
+
+This module contains the coroutines that run the approved conversions once the
+menus have been closed, starting queued conversions as running ones finish and
+refreshing the progress bars in the meantime. It is only imported by the
+convert command, so that asyncio is not imported by other invocations.
+
+"""
+
+import os
+import asyncio
+import collections
+
+from filmalize.errors import ProgressFinishedError
+
+# Seconds between progress bar refreshes while conversions are running.
+PROGRESS_INTERVAL = 0.25
+
+# The number of trailing lines of ffmpeg error output to keep and report.
+ERROR_LINES = 200
+
+
+def refresh(running, queued, pr_bar):
+    """Utility function to update the progress bars of the running
+    :obj:`CliContainer` instances and the bar showing the total progress.
+
+    Note:
+        A container's progress bar is only redrawn if its progress has
+        changed, so each refresh writes the total progress bar and the bars
+        of the containers that ffmpeg has reported on since the last one.
+        Containers that have finished are no longer visited; the total is
+        counted down from the length of the total progress bar.
+
+    Args:
+        running (:obj:`dict` of {:obj:`int`: :obj:`CliContainer`}): The
+            containers that are still converting, keyed by the process ids of
+            their ffmpeg subprocesses.
+        queued (:obj:`collections.deque` of :obj:`CliContainer`): The
+            containers that are waiting to be converted.
+        pr_bar (:obj:`ProgressBar`): The total progress bar.
+
+    """
+
+    remaining = sum(container.microseconds for container in queued)
+    for container in running.values():
+        try:
+            progress = min(container.progress, container.microseconds)
+        except ProgressFinishedError:
+            continue
+        if progress != container.pr_bar.value:
+            container.pr_bar.update(progress)
+        remaining += container.microseconds - progress
+
+    pr_bar.update(pr_bar.max_value - remaining)
+
+
+async def watch(container, running, err):
+    """Wait for the conversion of a :obj:`CliContainer` to finish, then
+    finish its progress bar and report any ffmpeg error.
+
+    The stderr pipe of the ffmpeg subprocess is registered with the event
+    loop, which drains its output as it is written, keeping only the last
+    :obj:`ERROR_LINES` lines. When ffmpeg exits, the pipe is closed and the
+    event loop is woken immediately, so the container can be removed from
+    the running containers by its process id.
+
+    Args:
+        container (:obj:`CliContainer`): The container to wait for.
+        running (:obj:`dict` of {:obj:`int`: :obj:`CliContainer`}): The
+            containers that are still converting, keyed by the process ids of
+            their ffmpeg subprocesses.
+        err (:obj:`ErrorWriter`): Where to report ffmpeg errors.
+
+    """
+
+    loop = asyncio.get_event_loop()
+    stderr = container.process.stderr.fileno()
+    closed = loop.create_future()
+    output = collections.deque(maxlen=ERROR_LINES)
+
+    def read_stderr():
+        """Collect available stderr output, or note that it was closed."""
+        chunk = os.read(stderr, 65536)
+        if chunk:
+            output.extend(chunk.splitlines(keepends=True))
+        else:
+            loop.remove_reader(stderr)
+            closed.set_result(None)
+
+    loop.add_reader(stderr, read_stderr)
+    await closed
+    del running[container.process.pid]
+    if container.process.wait():
+        err.write('Warning: ffmpeg error while converting {}'
+                  .format(container.file_name))
+        err.write(b''.join(output).decode(errors='replace')
+                  .strip(os.linesep))
+    container.pr_bar.finish()
+
+
+async def supervise(containers, pr_bar, err, limit):
+    """Monitor the conversion of a list of :obj:`CliContainer` instances
+    until they have all finished.
+
+    Each running container is finished by its own :obj:`watch` task as soon
+    as its subprocess exits. Containers that have not yet been started are
+    converted in order whenever fewer than the limit are running, each sharing
+    the cores with the conversions that can run alongside it. In the
+    meantime, the progress bars are refreshed every :obj:`PROGRESS_INTERVAL`
+    seconds.
+
+    Args:
+        containers (:obj:`list` of :obj:`CliContainer`): Containers approved
+            for conversion, in the order they were approved.
+        pr_bar (:obj:`ProgressBar`): The total progress bar.
+        err (:obj:`ErrorWriter`): Where to report ffmpeg errors.
+        limit (:obj:`int`): The number of conversions to run at once.
+
+    """
+
+    queued = collections.deque(container for container in containers
+                               if not container.process)
+    running = {container.process.pid: container for container in containers
+               if container.process}
+    watchers = {asyncio.ensure_future(watch(container, running, err))
+                for container in running.values()}
+    while True:
+        while queued and len(running) < limit:
+            concurrent = min(limit, len(running) + len(queued))
+            container = queued.popleft()
+            container.convert(concurrent)
+            running[container.process.pid] = container
+            watchers.add(asyncio.ensure_future(
+                watch(container, running, err)))
+        if not watchers:
+            break
+        refresh(running, queued, pr_bar)
+        done, watchers = await asyncio.wait(
+            watchers, timeout=PROGRESS_INTERVAL,
+            return_when=asyncio.FIRST_COMPLETED)
+        for watcher in done:
+            watcher.result()
+    refresh(running, queued, pr_bar)
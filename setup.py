@@ -8,7 +8,7 @@ setup(
     packages=['filmalize'],
     include_package_data=True,
     install_requires=[
-        'click', 'bitmath', 'colorama', 'chardet', 'blessed', 'progressbar2'
+        'click>=7', 'colorama', 'chardet', 'blessed'
     ],
     entry_points='''
         [console_scripts]
@@ -0,0 +1,39 @@
+"""Unit tests for filmalize.cli_models"""
+
+import json
+
+import click
+import pytest
+
+from filmalize.cli_models import CliContainer, SelectStreams
+
+with open('example.json') as example_file:
+    EXAMPLE = json.load(example_file)
+
+
+@pytest.fixture
+def example_cli_container():
+    """Return a CliContainer built from example.json."""
+    return CliContainer.from_dict(EXAMPLE)
+
+
+class TestSelectStreams(object):
+    """Tests for the SelectStreams click parameter type."""
+
+    def test_convert(self, example_cli_container):
+        """Ensure that indexes separated by any whitespace are selected, and
+        that repeated indexes are only selected once."""
+        select = SelectStreams(example_cli_container)
+        select.convert(' 2   0\t2 ', None, None)
+        assert example_cli_container.selected == [0, 2]
+
+    def test_convert_invalid(self, example_cli_container):
+        """Ensure that empty input, input that is not a list of integers, and
+        indexes that do not match a stream are rejected and leave the
+        selection unchanged."""
+        select = SelectStreams(example_cli_container)
+        original = example_cli_container.selected
+        for value in ['', '   ', '0 a', '0 99']:
+            with pytest.raises(click.BadParameter):
+                select.convert(value, None, None)
+            assert example_cli_container.selected == original
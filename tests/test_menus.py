@@ -0,0 +1,84 @@
+"""Unit tests for filmalize.menus"""
+
+import click
+from click.testing import CliRunner
+
+import filmalize.menus as menus
+from filmalize.menus import main_menu, multiple_choice, yes_no
+
+
+class FakeProcess(object):
+    """Stand in for a subprocess that runs until it is told to finish."""
+
+    def __init__(self):
+        self.returncode = None
+
+    def poll(self):
+        """Return the exit code, or None while running."""
+        return self.returncode
+
+
+class FakeContainer(object):
+    """Stand in for a CliContainer that records whether it was started."""
+
+    def __init__(self):
+        self.process = None
+        self.concurrent = None
+
+    def display_conversion(self):
+        """Display nothing."""
+
+    def convert(self, concurrent=1):
+        """Start a fake conversion."""
+        self.process = FakeProcess()
+        self.concurrent = concurrent
+
+
+def test_prompt_choices():
+    """Ensure that prompts list their choices, without doubled colons, and
+    repeat until a valid choice is entered."""
+
+    @click.command()
+    def ask():
+        """Ask a multiple choice and a yes/no question."""
+        click.echo(multiple_choice('Main Menu', ['c', 's'], 'Convert/Skip'))
+        click.echo(yes_no('Copy stream?'))
+
+    lines = CliRunner().invoke(ask, input='x\ns\ny\n').output.splitlines()
+    assert lines[2] == '*** Main Menu (c, s): x'
+    assert lines[4:] == [
+        '*** Main Menu (c, s): s',
+        's',
+        'Copy stream? (y, n): y',
+        'True',
+    ]
+
+
+def test_main_menu_order(monkeypatch):
+    """Ensure that approved containers are only started while a conversion
+    slot is free and no earlier approved container is waiting to start."""
+    monkeypatch.setattr(menus, 'multiple_choice', lambda *args: 'c')
+    first, second, third = FakeContainer(), FakeContainer(), FakeContainer()
+
+    def finish_first():
+        """Finish the first conversion before the third is approved."""
+        first.process.returncode = 0
+
+    third.display_conversion = finish_first
+    assert main_menu([first, second, third], 1) == [first, second, third]
+    assert first.process
+    assert not second.process
+    assert not third.process
+
+
+def test_main_menu_concurrent(monkeypatch):
+    """Ensure that conversions started before the last container share the
+    cores for the limit of conversions, and that the last shares them only
+    with those running."""
+    monkeypatch.setattr(menus, 'multiple_choice', lambda *args: 'c')
+    containers = [FakeContainer(), FakeContainer(), FakeContainer()]
+    main_menu(containers, 4)
+    assert [container.concurrent for container in containers] == [4, 4, 3]
+    only = FakeContainer()
+    main_menu([only], 4)
+    assert only.concurrent == 1
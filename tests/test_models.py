@@ -1,15 +1,16 @@
 """Unit and Integration tests for filmalize.models"""
 
-import datetime
 import json
 import os
 import subprocess
+import tempfile
 from collections import namedtuple
 from itertools import permutations
 
 import pytest
 
 import filmalize.defaults as defaults
+import filmalize.models as models
 from filmalize.errors import ProgressFinishedError
 from filmalize.models import (Container, ContainerLabel, Stream, StreamLabel,
                               SubtitleFile)
@@ -88,7 +89,7 @@ def example_container_label():
     """Return an example ContainerLabel that should match one built from
     example.json."""
     return ContainerLabel('Example Container', 4.94, 0.21, 'Matroska / WebM',
-                          datetime.timedelta(0, 187))
+                          '0:03:07')
 
 
 @pytest.fixture
@@ -130,6 +131,7 @@ def running_example_container():
             return None
     built = example_container()
     built.process = Proc()
+    built.temp_file = tempfile.NamedTemporaryFile(buffering=0)
     return built
 
 
@@ -339,6 +341,13 @@ class TestStreamBuildOptions:
                                          str(defaults.CRF), '-pix_fmt',
                                          'yuv420p']
 
+    def test_video_preset_override(self, monkeypatch):
+        """Ensure that video options use the preset set at build time."""
+        built = Stream(1, 'video', FAKE_CODEC)
+        built.build_options()
+        monkeypatch.setattr(defaults, 'PRESET', 'veryfast')
+        assert built.build_options()[3] == 'veryfast'
+
     def test_video_custom_crf(self):
         """Ensure that video options are properly generated with a custom
         crf."""
@@ -390,6 +399,20 @@ class TestStreamBuildOptions:
                 options = built.build_options(number)
                 assert options[0].split(':')[-1] == str(number)
 
+    def test_stream_options_edited(self):
+        """Ensure that Stream.build_options reflects edits made after options
+        have been built."""
+        built = Stream(1, 'audio', defaults.C_AUDIO)
+        assert built.build_options() == ['-c:a:0', 'copy']
+        built.custom_bitrate = 128
+        assert built.build_options() == ['-c:a:0', defaults.C_AUDIO,
+                                         '-b:a:0', '128k']
+        assert built.option_summary == ('transcode -> {}, bitrate=128Kib/s'
+                                        .format(defaults.C_AUDIO))
+        built.custom_bitrate = None
+        assert built.build_options() == ['-c:a:0', 'copy']
+        assert built.option_summary == 'copy'
+
 
 class TestContainerLabel:
     """Test the ContainerLabel class."""
@@ -406,7 +429,7 @@ class TestContainerLabel:
         instance."""
         attrs = {'title': 'Example Container', 'size': 4.94, 'bitrate': 0.21,
                  'container_format': 'Matroska / WebM',
-                 'length': datetime.timedelta(0, 187)}
+                 'length': '0:03:07'}
         for attr, value in attrs.items():
             assert getattr(example_container_label, attr) == value
 
@@ -430,9 +453,13 @@ class TestContainer:
         for attr, value in attrs.items():
             assert getattr(built, attr) == value
 
-    def test_temp_file(self, example_container):
-        """Ensure that Container.temp_file can be written to, read from, and
-        has a name attribute."""
+    def test_temp_file(self, monkeypatch, example_container):
+        """Ensure that Container.temp_file is only created once the
+        conversion is started, and can be written to, read from, and has a
+        name attribute."""
+        assert example_container.temp_file is None
+        monkeypatch.setattr(subprocess, 'Popen', lambda *args, **kwargs: True)
+        example_container.convert()
         assert example_container.temp_file.read() == b''
         assert example_container.temp_file.write(b'') == 0
         assert bool(example_container.temp_file.name)
@@ -465,8 +492,8 @@ class TestContainer:
             """Ensure that the ffprobe command is properly formatted. Return a
             mock ffprobe response based on example.json."""
             assert commands == [defaults.FFPROBE, '-v', 'error',
-                                '-show_format', '-show_streams', '-of', 'json',
-                                'example.ogv']
+                                '-show_entries', models._PROBE_ENTRIES,
+                                '-of', 'json', 'example.ogv']
             with open('example.json') as example_file:
                 example_text = '\n'.join(example_file.readlines())
 
@@ -476,6 +503,121 @@ class TestContainer:
         monkeypatch.setattr(subprocess, 'run', mockreturn)
         assert example_container == Container.from_file('example.ogv')
 
+    def test_from_file_cached(self, monkeypatch, tmpdir):
+        """Ensure that Container.from_file only probes a file once, and that
+        saved probe results are used by later runs."""
+
+        probes = []
+
+        def mockreturn(commands, stdout, stderr):
+            """Record the probe and return a mock ffprobe response based on
+            example.json."""
+            probes.append(commands[-1])
+            with open('example.json') as example_file:
+                info = json.load(example_file)
+            info['format']['filename'] = commands[-1]
+            probe = namedtuple('probe', ['returncode', 'stdout'])
+            return probe(False, json.dumps(info))
+
+        monkeypatch.setattr(subprocess, 'run', mockreturn)
+        monkeypatch.setattr(defaults, 'PROBE_CACHE',
+                            str(tmpdir.join('cache', 'probe.json')))
+        monkeypatch.setattr(models, '_PROBE_CACHE', None)
+        file_name = str(tmpdir.join('example.ogv'))
+        tmpdir.join('example.ogv').write('')
+
+        first = Container.from_file(file_name)
+        assert Container.from_file(file_name) == first
+        assert probes == [file_name]
+
+        models.save_probe_cache()
+        monkeypatch.setattr(models, '_PROBE_CACHE', None)
+        assert Container.from_file(file_name) == first
+        assert probes == [file_name]
+
+        tmpdir.join('cache', 'probe.json').remove()
+        models.save_probe_cache()
+        assert not tmpdir.join('cache', 'probe.json').exists()
+
+        tmpdir.join('example.ogv').write('changed')
+        Container.from_file(file_name)
+        assert probes == [file_name, file_name]
+
+    def test_from_file_cache_limits(self, monkeypatch, tmpdir):
+        """Ensure that cached probe results are not modified by later hits,
+        that only the most recently used entries are saved, and that no
+        temporary file is left behind if the cache cannot be saved."""
+
+        def mockreturn(commands, stdout, stderr):
+            """Return a mock ffprobe response based on example.json."""
+            with open('example.json') as example_file:
+                info = json.load(example_file)
+            info['format']['filename'] = commands[-1]
+            probe = namedtuple('probe', ['returncode', 'stdout'])
+            return probe(False, json.dumps(info))
+
+        monkeypatch.setattr(subprocess, 'run', mockreturn)
+        monkeypatch.setattr(defaults, 'PROBE_CACHE',
+                            str(tmpdir.join('cache', 'probe.json')))
+        monkeypatch.setattr(defaults, 'PROBE_CACHE_SIZE', 1)
+        monkeypatch.setattr(models, '_PROBE_CACHE', None)
+        first = str(tmpdir.join('first.ogv'))
+        second = str(tmpdir.join('second.ogv'))
+        tmpdir.join('first.ogv').write('')
+        tmpdir.join('second.ogv').write('')
+
+        Container.from_file(first)
+        Container.from_file(second)
+        monkeypatch.chdir(str(tmpdir))
+        assert Container.from_file('first.ogv').file_name == 'first.ogv'
+        assert (models._PROBE_CACHE[first]['info']['format']['filename']
+                == first)
+
+        models.save_probe_cache()
+        saved = json.loads(tmpdir.join('cache', 'probe.json').read())
+        assert list(saved['files']) == [first]
+
+        def fail_replace(source, destination):
+            """Fail to replace the cache file."""
+            raise OSError('replace failed')
+
+        Container.from_file(second)
+        with monkeypatch.context() as patch:
+            patch.setattr(os, 'replace', fail_replace)
+            models.save_probe_cache()
+        assert tmpdir.join('cache').listdir() == [tmpdir.join('cache',
+                                                              'probe.json')]
+
+    def test_from_file_cache_entries_changed(self, monkeypatch, tmpdir):
+        """Ensure that a probe cache saved with different probe entries is
+        discarded."""
+
+        probes = []
+
+        def mockreturn(commands, stdout, stderr):
+            """Record the probe and return a mock ffprobe response based on
+            example.json."""
+            probes.append(commands[-1])
+            with open('example.json') as example_file:
+                probe = namedtuple('probe', ['returncode', 'stdout'])
+                return probe(False, example_file.read())
+
+        monkeypatch.setattr(subprocess, 'run', mockreturn)
+        monkeypatch.setattr(defaults, 'PROBE_CACHE',
+                            str(tmpdir.join('probe.json')))
+        monkeypatch.setattr(models, '_PROBE_CACHE', None)
+        file_name = str(tmpdir.join('example.ogv'))
+        tmpdir.join('example.ogv').write('')
+        Container.from_file(file_name)
+        models.save_probe_cache()
+
+        saved = json.loads(tmpdir.join('probe.json').read())
+        saved['entries'] = 'format=filename'
+        tmpdir.join('probe.json').write(json.dumps(saved))
+        monkeypatch.setattr(models, '_PROBE_CACHE', None)
+        Container.from_file(file_name)
+        assert probes == [file_name, file_name]
+
     def test_streams_dict(self, example_container):
         """Ensure that the streams_dict property properly numbers and includes
         Streams."""
@@ -492,14 +634,30 @@ class TestContainer:
         with pytest.raises(ProgressFinishedError):
             print(finished_example_container.progress)
 
-    def test_progress_running(self, running_example_container):
+    def test_progress_running(self):
         """Ensure that the progress property can properly extract progress
         information from a running process."""
-        mock_file = namedtuple('temp_file', ['name'])
         examples = {'example0.tmp': 186731950, 'example1.tmp': 38193968}
         for temp_file, progress in examples.items():
-            running_example_container.temp_file = mock_file(temp_file)
-            assert running_example_container.progress == progress
+            container = running_example_container()
+            container.temp_file = open(temp_file, 'rb')
+            assert container.progress == progress
+            container.temp_file.close()
+
+    def test_progress_incremental(self, running_example_container):
+        """Ensure that the progress property only reads complete lines that
+        have been written since it was last checked."""
+        status = running_example_container.temp_file
+        assert running_example_container.progress == 0
+        status.write(b'out_time_ms=1000\nprogress=continue\nout_time_ms=20')
+        status.flush()
+        assert running_example_container.progress == 1000
+        status.write(b'00\nprogress=continue\n')
+        status.flush()
+        assert running_example_container.progress == 2000
+        status.write(b'out_time_ms=N/A\n')
+        status.flush()
+        assert running_example_container.progress == 2000
 
     def test_selected(self, example_container):
         """Ensure that all combinations of streams from the example Container
@@ -540,11 +698,11 @@ class TestContainer:
         """Ensure that the Container.build_command method properly builds
         ffmpeg commands for the example container."""
         assert example_container.build_command() == [
-            defaults.FFMPEG, '-nostdin', '-progress',
-            example_container.temp_file.name, '-v', 'error', '-y', '-i',
+            defaults.FFMPEG, '-nostdin', '-v', 'error', '-y', '-i',
             example_container.file_name, '-map', '0:0', '-map', '0:1',
             *example_video_stream.build_options(),
             *example_audio_stream.build_options(),
+            '-threads', str(models._conversion_threads(1)),
             './{}'.format(example_container.output_name)
         ]
 
@@ -555,31 +713,43 @@ class TestContainer:
         example_container.add_subtitle_file('example.srt')
         example_container.selected = [0, 2]
         assert example_container.build_command() == [
-            defaults.FFMPEG, '-nostdin', '-progress',
-            example_container.temp_file.name, '-v', 'error', '-y', '-i',
+            defaults.FFMPEG, '-nostdin', '-v', 'error', '-y', '-i',
             example_container.file_name, '-sub_charenc', 'ascii', '-i',
             'example.srt', '-map', '0:0', '-map', '0:2', '-map', '1:0',
             *example_video_stream.build_options(),
             *other_audio_stream.build_options(),
             '-c:s:0', *example_sub_file.options,
+            '-threads', str(models._conversion_threads(1)),
             './{}'.format(example_container.output_name)
         ]
 
+    def test_build_command_threads(self, monkeypatch, example_container):
+        """Ensure that a single conversion may use every core, that the cores
+        are shared between concurrent conversions, and that a set thread
+        count is used as is."""
+        monkeypatch.setattr(os, 'cpu_count', lambda: 16)
+        monkeypatch.setattr(defaults, 'THREADS', None)
+        assert example_container.build_command()[-3:-1] == ['-threads', '16']
+        assert example_container.build_command(4)[-3:-1] == ['-threads', '4']
+        monkeypatch.setattr(defaults, 'THREADS', 3)
+        assert example_container.build_command(4)[-3:-1] == ['-threads', '3']
+
     def test_convert(self, monkeypatch, example_container,
                      example_audio_stream, example_video_stream):
         """Ensure that the Container.convert method calls subprocess.Popen with
         the proper arguments."""
-        def mockreturn(command, stderr, universal_newlines):
+        def mockreturn(command, stderr, bufsize):
             assert command == [
                 defaults.FFMPEG, '-nostdin', '-progress',
                 example_container.temp_file.name, '-v', 'error', '-y', '-i',
                 example_container.file_name, '-map', '0:0', '-map', '0:1',
                 *example_video_stream.build_options(),
                 *example_audio_stream.build_options(),
+                '-threads', str(models._conversion_threads(1)),
                 './{}'.format(example_container.output_name)
             ]
             assert stderr == subprocess.PIPE
-            assert universal_newlines is True
+            assert bufsize == 0
             return True
 
         monkeypatch.setattr(subprocess, 'Popen', mockreturn)
@@ -0,0 +1,87 @@
+"""Unit tests for filmalize.supervisor"""
+
+import asyncio
+import subprocess
+import sys
+
+from filmalize.supervisor import supervise
+
+
+class FakeBar(object):
+    """Stand in for a ProgressBar."""
+
+    def __init__(self, max_value=0):
+        self.max_value = max_value
+        self.value = 0
+
+    def update(self, value):
+        """Record the value."""
+        self.value = value
+
+    def finish(self):
+        """Fill the bar."""
+        self.value = self.max_value
+
+
+class FakeContainer(object):
+    """Stand in for a CliContainer whose conversion is a short sleep, and
+    which records the order in which conversions are started and how many
+    were running at the time."""
+
+    def __init__(self, name, started):
+        self.file_name = name
+        self.started = started
+        self.process = None
+        self.microseconds = 1
+        self.progress = 0
+        self.pr_bar = FakeBar(1)
+
+    def convert(self, concurrent=1):
+        """Start a short subprocess in place of ffmpeg."""
+        self.concurrent = concurrent
+        self.process = subprocess.Popen(
+            [sys.executable, '-c', 'import time; time.sleep(0.2)'],
+            stderr=subprocess.PIPE
+        )
+        running = [container for container in self.started
+                   if container.process.poll() is None]
+        self.started.append(self)
+        self.running = len(running) + 1
+
+
+def run(containers, limit):
+    """Supervise the containers to completion."""
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(supervise(containers, FakeBar(len(containers)),
+                                          None, limit))
+    finally:
+        loop.close()
+
+
+def test_supervise_limit():
+    """Ensure that queued containers are started in order, never while the
+    limit of conversions are running, and sharing the cores with only those
+    that can run alongside them."""
+    started = []
+    containers = [FakeContainer(name, started) for name in 'abcde']
+    containers[0].convert(2)
+    run(containers, 2)
+    assert started == containers
+    assert max(container.running for container in containers) <= 2
+    assert [container.concurrent for container in containers] == [2] * 5
+    assert all(container.process.returncode == 0
+               for container in containers)
+
+
+def test_supervise_finished_slot():
+    """Ensure that a conversion that finished while the menus were open does
+    not free a slot that a later started conversion is still using."""
+    started = []
+    first, second, third = (FakeContainer(name, started) for name in 'abc')
+    first.convert()
+    first.process.wait()
+    third.convert()
+    run([first, second, third], 1)
+    assert started == [first, third, second]
+    assert second.running == 1